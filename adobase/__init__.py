@@ -1,3 +1,8 @@
 # ADOBase 库初始化
  
-from .level import ADOFAILevel 
\ No newline at end of file
+from .level import ADOFAILevel
+from .stream import iter_events, iter_decorations
+from .pipeline import LevelPipeline
+from .stats import LevelStats
+from .concurrency import RWLock
+from .schema import LevelValidator 
\ No newline at end of file
@@ -1,27 +1,155 @@
 import json
+import functools
+from contextlib import nullcontext
+from types import MappingProxyType
 from .utils import parse_adofai_to_json_str, add_bom, remove_bom, to_adofai_style_json
 from .params import LEVEL_PARAMS, LEVEL_BASE, is_valid_param, LevelSettingsDict
+from .stats import LevelStats, compute_level_stats
+from .concurrency import RWLock
+from .schema import get_validator
+
+# 可通过本类方法修改的数据段，快照与写入方之间按段写时复制
+COW_SECTIONS = ('settings', 'actions', 'decorations')
+
+def _mutator(*sections, copy_items=True):
+    """
+    标记会修改关卡数据的方法（sections 为原地修改的数据段）：
+    - 快照为只读，调用时抛出 TypeError
+    - 并发模式下持有写锁执行
+    - 该数据段被快照共享时先复制一份再修改；只增删列表元素、不修改其中对象的方法
+      传 copy_items=False，只复制列表本身
+    - 调用后递增版本号，使缓存失效
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self._read_only:
+                raise TypeError("关卡快照为只读，不能修改")
+            with self.lock.write() if self.lock is not None else nullcontext():
+                self._unshare(*sections, copy_items=copy_items)
+                try:
+                    return method(self, *args, **kwargs)
+                finally:
+                    self._version += 1
+        return wrapper
+    return decorator
+
+def _raise_if_invalid(errors) -> None:
+    """校验失败时抛出 ValueError，包含全部错误信息"""
+    if errors:
+        raise ValueError("数据校验失败：" + "；".join(errors))
+
+def _reader(method):
+    """标记只读方法：并发模式下持有读锁执行"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.lock is None:
+            return method(self, *args, **kwargs)
+        with self.lock.read():
+            return method(self, *args, **kwargs)
+    return wrapper
 
 class ADOFAILevel:
-    def __init__(self, data: dict, raw_text: str = None):
+    def __init__(self, data: dict, raw_text: str = None, concurrent: bool = False,
+                 validate_on_write: bool = False):
+        """
+        参数：
+            data (dict): 关卡数据
+            raw_text (str, 可选): 原始文本
+            concurrent (bool): 并发模式。为 True 时读方法持有读锁、写方法持有写锁，
+                get_level_info() 返回只读视图而非副本，可在多线程间共享同一关卡
+            validate_on_write (bool): 为 True 时修改方法写入前校验字段类型，不合法时抛出 ValueError
+        """
         self.data = data
         self.raw_text = raw_text  # 保存原始文本，便于原样导出
+        self.validate_on_write = validate_on_write
+        self.lock = RWLock() if concurrent else None
+        self._version = 0  # 每次修改后递增，用于判断缓存是否过期
+        self._stats = None
+        self._stats_version = -1
+        self._read_only = False
+        self._snapshot = None
+        self._shared_root = False  # self.data 顶层字典是否被快照共享
+        self._shared = set()  # 容器本身被快照共享的数据段
+        self._shared_items = set()  # 列表中的对象被快照共享的数据段
+
+    @property
+    def version(self) -> int:
+        """数据版本号，每次修改后递增"""
+        return self._version
+
+    def _unshare(self, *sections: str, copy_items: bool = True) -> None:
+        """
+        写时复制：修改前复制被快照共享的数据，快照中的数据保持不变。
+        先浅复制数据段本身；copy_items 为 True 时再逐个浅复制列表中的对象。
+        """
+        if self._shared_root:
+            self.data = dict(self.data)
+            self._shared_root = False
+        for section in sections:
+            value = self.data.get(section)
+            if section in self._shared:
+                if isinstance(value, dict):
+                    value = self.data[section] = dict(value)
+                elif isinstance(value, list):
+                    value = self.data[section] = list(value)
+                self._shared.discard(section)
+            if copy_items and section in self._shared_items:
+                if isinstance(value, list):
+                    value[:] = [dict(item) if isinstance(item, dict) else item for item in value]
+                self._shared_items.discard(section)
+
+    @_mutator()
+    def _replace_sections(self, compute) -> None:
+        """
+        在写锁内调用 compute(data) 计算新的数据段，并整段替换（供 LevelPipeline 使用）。
+        compute 返回 {数据段名: 新值}，不得原地修改 data；抛出异常时关卡保持不变。
+        新数据段本身不再共享；其中未修改的对象仍可能与快照共享，保留对象的写时复制标记。
+        """
+        for section, value in compute(self.data).items():
+            self.data[section] = value
+            self._shared.discard(section)
+
+    @_reader
+    def snapshot(self) -> 'ADOFAILevel':
+        """
+        获取当前版本的只读快照。
+        快照与关卡共享数据，获取快照不复制数据；之后的修改按数据段写时复制，不影响已有快照。
+        同一版本多次调用返回同一个快照对象。
+        返回：
+            只读的 ADOFAILevel，可调用所有查询方法，调用修改方法会抛出 TypeError
+        用法：
+            snap = level.snapshot()
+            snap.get_tile_event(1)  # 其他线程修改 level 或对 level 执行 LevelPipeline 时结果不变
+        """
+        snap = self._snapshot
+        if snap is None or snap.version != self._version:
+            snap = ADOFAILevel(self.data, raw_text=self.raw_text)
+            snap._read_only = True
+            snap._version = self._version
+            self._shared_root = True
+            self._shared = set(COW_SECTIONS)
+            self._shared_items = set(COW_SECTIONS)
+            self._snapshot = snap
+        return snap
 
     @classmethod
-    def load(cls, filepath: str) -> 'ADOFAILevel':
-        """从 .adofai 文件加载关卡，自动修正为标准 JSON，自动去除 BOM"""
+    def load(cls, filepath: str, concurrent: bool = False, validate_on_write: bool = False) -> 'ADOFAILevel':
+        """从 .adofai 文件加载关卡，自动修正为标准 JSON，自动去除 BOM；concurrent、validate_on_write 同构造函数"""
         with open(filepath, 'r', encoding='utf-8') as f:
             raw_text = f.read()
         raw_text = remove_bom(raw_text)
         json_str = parse_adofai_to_json_str(raw_text)
         data = json.loads(json_str)
-        return cls(data, raw_text=raw_text)
+        return cls(data, raw_text=raw_text, concurrent=concurrent, validate_on_write=validate_on_write)
 
+    @_reader
     def save(self, filepath: str) -> None:
         """保存关卡到 .adofai 文件（标准 JSON 格式，无 BOM，adodai 风格缩进）"""
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(to_adofai_style_json(self.data))
 
+    @_reader
     def export(self, filepath: str, as_original: bool = False) -> None:
         """
         导出关卡文件：
@@ -39,10 +167,47 @@ class ADOFAILevel:
             with open(filepath, 'w', encoding='utf-8') as f:
                 f.write(to_adofai_style_json(self.data))
 
+    @_reader
+    def validate(self, strict: bool = False) -> list:
+        """
+        一次遍历校验整个关卡（angleData、settings、actions、decorations）。
+        字段类型由 params.py 与 defaults.json 模板推断并预先编译，见 schema.LevelValidator。
+        参数：
+            strict (bool): 为 True 时未知字段、未知事件/装饰物类型也视为错误
+        返回：
+            错误信息列表，为空表示校验通过
+        """
+        return get_validator(strict).validate(self.data)
+
+    def mark_modified(self) -> None:
+        """
+        直接修改 self.data（而非通过本类方法）后调用，使 stats() 等缓存失效。
+        注意：直接修改不会触发写时复制，已有快照中的数据也会随之改变。
+        """
+        self._version += 1
+
+    @_reader
+    def stats(self) -> LevelStats:
+        """
+        一次遍历统计关卡信息，结果缓存到下一次修改前。
+        返回：
+            LevelStats，包含各 eventType / floor / (floor, eventType) 的事件数、
+            装饰物数、砖块数、角度分布及关卡时长（秒，无法计算时为 None）
+        注意：
+            通过本类方法修改关卡会自动使缓存失效；直接修改 data 后需调用 mark_modified()。
+            返回的对象为缓存本身，请勿修改（需要合并时用 + 或 copy()）。
+        """
+        if self._stats_version != self._version:
+            self._stats = compute_level_stats(self.data)
+            self._stats_version = self._version
+        return self._stats
+
+    @_reader
     def get_level_info(self, *fields) -> dict:
         """
         获取关卡信息。
-        - 不传参数时，返回 settings 下所有字段及其值的字典
+        - 不传参数时，返回 settings 下所有字段及其值的字典（并发模式与快照下为只读视图，
+          之后的修改按写时复制进行，视图内容保持为获取时的状态）
         - 传参数为 'levelbase' 时，返回关卡基本信息字典（song, artist, author）
         - 传多个参数时，支持 levelbase 与其他参数混用，合并返回
         - 传单个参数时，直接返回该字段的值
@@ -52,6 +217,12 @@ class ADOFAILevel:
             if not is_valid_param(field):
                 raise ValueError(f"无效的关卡参数: {field}")
         if not fields:
+            if self.lock is not None or self._read_only:
+                # 并发模式与快照返回只读视图，避免每次复制；
+                # 标记 settings 被共享，下次修改时先复制，视图不会看到之后（或只写了一半）的修改
+                if not self._read_only:
+                    self._shared.add('settings')
+                return MappingProxyType(settings)
             return settings.copy()
         result = {}
         for field in fields:
@@ -65,6 +236,7 @@ class ADOFAILevel:
             return next(iter(result.values()))
         return result
             
+    @_reader
     def print_level_info(self, *fields) -> dict:
         """
         打印关卡信息（兼容旧版本）。
@@ -79,6 +251,7 @@ class ADOFAILevel:
             print(f"{fields[0]}: {result}")
         return result
 
+    @_mutator('settings')
     def edit_level_info(self, **kwargs) -> None:
         """
         编辑关卡信息。
@@ -89,11 +262,14 @@ class ADOFAILevel:
         for k in kwargs:
             if k not in LEVEL_PARAMS:
                 raise ValueError(f"无效的关卡参数: {k}")
+        if self.validate_on_write:
+            _raise_if_invalid(get_validator().check_settings(kwargs))
         for k, v in kwargs.items():
             if k not in settings:
                 raise KeyError(f"关卡文件中不存在字段: {k}")
             settings[k] = v 
 
+    @_reader
     def get_tile_event(self, floor: int, event_type: str = None):
         """
         获取指定floor编号的事件。
@@ -110,6 +286,7 @@ class ADOFAILevel:
             filtered = [action for action in filtered if action.get('eventType') == event_type]
         return filtered 
 
+    @_reader
     def get_event_count(self, floor: int = None, event_type: str = None) -> int:
         """
         统计事件数量。
@@ -132,6 +309,7 @@ class ADOFAILevel:
         # floor和event_type都传
         return sum(1 for action in actions if action.get('floor') == floor and action.get('eventType') == event_type)
 
+    @_reader
     def batch_get_event_info(self, event_type: str, attr: str = None):
         """
         批量获取所有指定类型事件的信息。
@@ -148,6 +326,7 @@ class ADOFAILevel:
             return [{attr: action.get(attr, None)} for action in filtered]
         return filtered
 
+    @_reader
     def get_event_info(self, floor: int, event_type: str, index: int = 0, *attrs):
         """
         获取指定砖块(floor)上指定类型(event_type)的第index个事件信息，支持指定返回的属性。
@@ -173,6 +352,7 @@ class ADOFAILevel:
             return event.get(attrs[0], None)
         return {attr: event.get(attr, None) for attr in attrs}
 
+    @_mutator('actions')
     def edit_event_info(self, floor: int, event_type: str, index: int = 0, **kwargs):
         """
         编辑指定砖块(floor)上指定类型(event_type)的第index个事件的属性。
@@ -189,10 +369,13 @@ class ADOFAILevel:
             raise IndexError(f"floor={floor} 上没有类型为 {event_type} 的事件")
         if index < 0 or index >= len(events):
             raise IndexError(f"floor={floor} 上类型为 {event_type} 的事件数量为{len(events)}，索引{index}超出范围")
+        if self.validate_on_write:
+            _raise_if_invalid(get_validator().check_event_attrs(event_type, kwargs))
         event = events[index]
         for k, v in kwargs.items():
             event[k] = v 
 
+    @_mutator('actions')
     def batch_edit_event(self, event_type: str, floor: int = None, **kwargs):
         """
         批量修改事件属性。
@@ -206,6 +389,8 @@ class ADOFAILevel:
             batch_edit_event('MoveDecorations', duration=1, tag='2')  # 全关卡
             batch_edit_event('MoveDecorations', floor=3, duration=2)  # 只修改3号砖块
         """
+        if self.validate_on_write:
+            _raise_if_invalid(get_validator().check_event_attrs(event_type, kwargs))
         actions = self.data.get('actions', [])
         count = 0
         for action in actions:
@@ -216,6 +401,7 @@ class ADOFAILevel:
                     count += 1
         return count  # 返回修改的事件数量 
     
+    @_mutator('actions', copy_items=False)
     def add_event(self, floor: int, event_type: str, *args, **kwargs):
         """
         向指定floor添加事件。
@@ -239,6 +425,8 @@ class ADOFAILevel:
         else:
             event = {'floor': floor, 'eventType': event_type}
             event.update(kwargs)
+        if self.validate_on_write:
+            _raise_if_invalid(get_validator().check_event(event))
 
         # 寻找插入位置
         insert_idx = None
@@ -258,6 +446,7 @@ class ADOFAILevel:
         else:
             actions.append(event) 
 
+    @_mutator('actions', copy_items=False)
     def remove_event(self, floor: int = None, event_type: str = None, index: int = None):
         """
         删除事件。
@@ -309,6 +498,7 @@ class ADOFAILevel:
             removed.reverse()
         return removed[0] if index is not None else removed
 
+    @_reader
     def get_tile_decoration(self, floor: int, decoration_type: str = None):
         """
         获取指定floor编号的装饰信息。
@@ -325,6 +515,7 @@ class ADOFAILevel:
             filtered = [item for item in filtered if item.get('eventType') == decoration_type]
         return filtered
 
+    @_reader
     def get_decoration_count(self, floor: int = None, decoration_type: str = None) -> int:
         """
         统计装饰物数量。
@@ -347,6 +538,7 @@ class ADOFAILevel:
         # floor和decoration_type都传
         return sum(1 for deco in decorations if deco.get('floor') == floor and deco.get('eventType') == decoration_type)
 
+    @_reader
     def batch_get_decoration_info(self, decoration_type: str, attr: str = None):
         """
         批量获取所有指定类型装饰物的信息。
@@ -363,6 +555,7 @@ class ADOFAILevel:
             return [{attr: deco.get(attr, None)} for deco in filtered]
         return filtered 
 
+    @_reader
     def get_decoration_info(self, floor: int, decoration_type: str, index: int = 0, *attrs):
         """
         获取指定砖块(floor)上指定类型(decoration_type)的第index个装饰物信息，支持指定返回的属性。
@@ -388,6 +581,7 @@ class ADOFAILevel:
             return deco.get(attrs[0], None)
         return {attr: deco.get(attr, None) for attr in attrs}
 
+    @_mutator('decorations')
     def edit_decoration_info(self, floor: int, decoration_type: str, index: int = 0, **kwargs):
         """
         编辑指定砖块(floor)上指定类型(decoration_type)的第index个装饰物的属性。
@@ -404,10 +598,13 @@ class ADOFAILevel:
             raise IndexError(f"floor={floor} 上没有类型为 {decoration_type} 的装饰物")
         if index < 0 or index >= len(decorations):
             raise IndexError(f"floor={floor} 上类型为 {decoration_type} 的装饰物数量为{len(decorations)}，索引{index}超出范围")
+        if self.validate_on_write:
+            _raise_if_invalid(get_validator().check_decoration_attrs(decoration_type, kwargs))
         deco = decorations[index]
         for k, v in kwargs.items():
             deco[k] = v 
             
+    @_mutator('decorations')
     def batch_edit_decoration(self, decoration_type: str, floor: int = None, **kwargs):
         """
         批量修改装饰物属性。
@@ -419,6 +616,8 @@ class ADOFAILevel:
             batch_edit_decoration('AddDecoration', scale=1.5, tag='background')  # 全关卡
             batch_edit_decoration('AddDecoration', floor=2, scale=2.0)  # 只修改2号砖块
         """
+        if self.validate_on_write:
+            _raise_if_invalid(get_validator().check_decoration_attrs(decoration_type, kwargs))
         decorations = self.data.get('decorations', [])
         count = 0
         for decoration in decorations:
@@ -429,6 +628,7 @@ class ADOFAILevel:
                     count += 1
         return count  # 返回修改的装饰物数量 
 
+    @_mutator('decorations', copy_items=False)
     def add_decoration(self, floor: int, decoration_type: str, *args, **kwargs):
         """
         向指定floor添加装饰物。
@@ -452,6 +652,8 @@ class ADOFAILevel:
         else:
             deco = {'floor': floor, 'eventType': decoration_type}
             deco.update(kwargs)
+        if self.validate_on_write:
+            _raise_if_invalid(get_validator().check_decoration(deco))
 
         # 寻找插入位置
         insert_idx = None
@@ -471,6 +673,7 @@ class ADOFAILevel:
         else:
             decorations.append(deco)
 
+    @_mutator('decorations', copy_items=False)
     def remove_decoration(self, floor: int = None, decoration_type: str = None, index: int = None):
         """
         删除装饰物。
@@ -0,0 +1,279 @@
+# 多关卡批处理流水线：把一串编辑步骤合并为一次遍历，并用进程池批量处理文件
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .level import ADOFAILevel, _raise_if_invalid
+from .params import LEVEL_PARAMS
+from .schema import get_validator
+from .utils import to_adofai_style_json, add_bom, atomic_write_text
+
+
+class _EditStep:
+    """批量修改步骤：对匹配的对象写入 kwargs（写入副本，不修改原对象）"""
+
+    def __init__(self, item_type: str, floor: int, kwargs: dict):
+        self.item_type = item_type
+        self.floor = floor
+        self.kwargs = kwargs
+
+    def apply(self, item: dict, matched: dict):
+        """返回处理后的对象"""
+        if item.get('eventType') == self.item_type:
+            if self.floor is None or item.get('floor') == self.floor:
+                item = dict(item)
+                item.update(self.kwargs)
+        return item
+
+    def finish(self, matched: dict):
+        pass
+
+
+class _RemoveStep:
+    """
+    删除步骤：匹配规则与 ADOFAILevel.remove_event / remove_decoration 一致。
+    已匹配数记在每次执行的 matched 字典中而非步骤上，同一流水线可在多个线程中同时使用。
+    """
+
+    def __init__(self, kind: str, type_name: str, floor: int, item_type: str, index: int):
+        self.kind = kind
+        self.type_name = type_name
+        self.floor = floor
+        self.item_type = item_type
+        self.index = index
+
+    def _match(self, item: dict) -> bool:
+        if self.floor is None and self.item_type is None:
+            # 无参数时清空全部；只传 index 时与原方法一致，不匹配任何对象
+            return self.index is None
+        if self.floor is None:
+            return item.get('eventType') == self.item_type
+        if item.get('floor') != self.floor:
+            return False
+        return self.item_type is None or item.get('eventType') == self.item_type
+
+    def apply(self, item: dict, matched: dict):
+        """返回处理后的对象，返回 None 表示该对象被删除"""
+        if not self._match(item):
+            return item
+        pos = matched.get(self, 0)
+        matched[self] = pos + 1
+        return item if self.index is not None and pos != self.index else None
+
+    def finish(self, matched: dict):
+        if self.floor is None and self.item_type is None and self.index is None:
+            return
+        count = matched.get(self, 0)
+        if not count:
+            raise IndexError(
+                f"未找到要删除的{self.kind}："
+                + (f"floor={self.floor} " if self.floor is not None else "")
+                + (f"{self.type_name}={self.item_type}" if self.item_type is not None else "")
+            )
+        if self.index is not None and (self.index < 0 or self.index >= count):
+            raise IndexError(f"{self.kind}数量为{count}，索引{self.index}超出范围")
+
+
+class LevelPipeline:
+    """
+    关卡批处理流水线。
+    先声明一串编辑步骤（方法名与参数同 ADOFAILevel），处理每个关卡时
+    actions 与 decorations 各只遍历一次，依次对每个对象执行所有步骤。
+    全部步骤成功时结果与逐步调用一致；任一步骤出错时抛出异常，关卡保持不变。
+    用法：
+        pipeline = (LevelPipeline()
+                    .edit_level_info(bpm=180)
+                    .batch_edit_event('Twirl', floor=3, angleOffset=0)
+                    .remove_event(event_type='MoveDecorations'))
+        pipeline.apply(level)                         # 处理单个关卡
+        pipeline.run(paths, output_dir='out')         # 多进程批量处理文件
+    """
+
+    def __init__(self):
+        self.settings = {}
+        self.event_steps = []
+        self.decoration_steps = []
+
+    def edit_level_info(self, **kwargs) -> 'LevelPipeline':
+        """添加关卡信息编辑步骤，参数校验同 ADOFAILevel.edit_level_info"""
+        for k in kwargs:
+            if k not in LEVEL_PARAMS:
+                raise ValueError(f"无效的关卡参数: {k}")
+        self.settings.update(kwargs)
+        return self
+
+    def batch_edit_event(self, event_type: str, floor: int = None, **kwargs) -> 'LevelPipeline':
+        """添加事件批量修改步骤，同 ADOFAILevel.batch_edit_event"""
+        self.event_steps.append(_EditStep(event_type, floor, kwargs))
+        return self
+
+    def remove_event(self, floor: int = None, event_type: str = None, index: int = None) -> 'LevelPipeline':
+        """添加事件删除步骤，同 ADOFAILevel.remove_event"""
+        self.event_steps.append(_RemoveStep('事件', 'event_type', floor, event_type, index))
+        return self
+
+    def batch_edit_decoration(self, decoration_type: str, floor: int = None, **kwargs) -> 'LevelPipeline':
+        """添加装饰物批量修改步骤，同 ADOFAILevel.batch_edit_decoration"""
+        self.decoration_steps.append(_EditStep(decoration_type, floor, kwargs))
+        return self
+
+    def remove_decoration(self, floor: int = None, decoration_type: str = None, index: int = None) -> 'LevelPipeline':
+        """添加装饰物删除步骤，同 ADOFAILevel.remove_decoration"""
+        self.decoration_steps.append(_RemoveStep('装饰物', 'decoration_type', floor, decoration_type, index))
+        return self
+
+    def apply(self, level: ADOFAILevel) -> ADOFAILevel:
+        """
+        对单个关卡执行所有步骤（原地修改）。
+        先在副本上执行全部步骤，都成功后才整段替换关卡数据：
+        字段不存在时抛出 KeyError，删除步骤找不到对象时抛出 IndexError，出错时关卡保持不变。
+        与 ADOFAILevel 的修改方法一样：对快照调用时抛出 TypeError，并发模式下持有写锁，不影响已有快照；
+        关卡开启 validate_on_write 时先校验所有编辑步骤写入的字段，不合法时抛出 ValueError。
+        """
+        level._replace_sections(lambda data: self._compute(data, level.validate_on_write))
+        return level
+
+    def _check(self) -> list:
+        """校验关卡信息与各编辑步骤要写入的字段，返回错误信息列表"""
+        validator = get_validator()
+        errors = validator.check_settings(self.settings)
+        for step in self.event_steps:
+            if isinstance(step, _EditStep):
+                errors.extend(validator.check_event_attrs(step.item_type, step.kwargs))
+        for step in self.decoration_steps:
+            if isinstance(step, _EditStep):
+                errors.extend(validator.check_decoration_attrs(step.item_type, step.kwargs))
+        return errors
+
+    def _compute(self, data: dict, validate: bool = False) -> dict:
+        """在副本上执行全部步骤，返回 {数据段名: 新值}"""
+        if validate:
+            _raise_if_invalid(self._check())
+        sections = {}
+        if self.settings:
+            settings = data.get('settings', {})
+            for k in self.settings:
+                if k not in settings:
+                    raise KeyError(f"关卡文件中不存在字段: {k}")
+            sections['settings'] = {**settings, **self.settings}
+        # 缺少 actions / decorations 时按空数组处理（删除步骤照常抛出 IndexError），结果为空时不新增该字段
+        for section, steps in (('actions', self.event_steps), ('decorations', self.decoration_steps)):
+            items = _run_steps(data.get(section, []), steps)
+            if items is not None and (section in data or items):
+                sections[section] = items
+        return sections
+
+    def process_file(self, src: str, dst: str = None, as_original: bool = False) -> str:
+        """
+        处理单个文件并原子写入结果（先写临时文件再替换，中途失败不会留下半个文件）。
+        参数：
+            src (str): 输入 .adofai 文件
+            dst (str, 可选): 输出路径，不填则覆盖输入文件
+            as_original (bool): 同 ADOFAILevel.export，True 时输出带 BOM
+        返回：
+            输出路径
+        """
+        dst = dst or src
+        level = self.apply(ADOFAILevel.load(src))
+        content = to_adofai_style_json(level.data)
+        if as_original:
+            content = add_bom(content)
+        atomic_write_text(dst, content)
+        return dst
+
+    def run(self, filepaths, output_dir: str = None, max_workers: int = None,
+            as_original: bool = False, progress=None) -> list:
+        """
+        用进程池批量处理多个文件。
+        参数：
+            filepaths: 输入文件路径列表
+            output_dir (str, 可选): 输出目录（保留原文件名），不填则覆盖输入文件。
+                多个输入对应同一输出路径时（如不同目录下的同名文件），这些文件都不处理并报告错误
+            max_workers (int, 可选): 进程数，默认为 CPU 数；为 1 时在当前进程中顺序执行
+            as_original (bool): 同 ADOFAILevel.export，True 时输出带 BOM
+            progress (callable, 可选): 每完成一个文件调用 progress(done, total, result)
+        返回：
+            与输入顺序一致的结果列表，每项为 {'input', 'output', 'error'}，成功时 error 为 None
+        注意：
+            Windows 下使用进程池时，调用代码需放在 if __name__ == "__main__": 中
+        """
+        filepaths = list(filepaths)
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+        jobs = [
+            (src, src if output_dir is None else os.path.join(output_dir, os.path.basename(src)))
+            for src in filepaths
+        ]
+        total = len(jobs)
+        results = [None] * total
+        done = 0
+        # 输出路径冲突的文件直接报告错误，避免结果互相覆盖
+        outputs = {}
+        for src, dst in jobs:
+            outputs.setdefault(os.path.normcase(os.path.abspath(dst)), []).append(src)
+        pending = []
+        for i, (src, dst) in enumerate(jobs):
+            sources = outputs[os.path.normcase(os.path.abspath(dst))]
+            if len(sources) > 1:
+                results[i] = {'input': src, 'output': None,
+                              'error': f"输出路径冲突: {dst} 同时对应 {', '.join(sources)}"}
+                done += 1
+                if progress is not None:
+                    progress(done, total, results[i])
+            else:
+                pending.append(i)
+        if max_workers == 1:
+            for i in pending:
+                src, dst = jobs[i]
+                results[i] = _process_job(self, src, dst, as_original)
+                done += 1
+                if progress is not None:
+                    progress(done, total, results[i])
+            return results
+        if not pending:
+            return results
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(_process_job, self, jobs[i][0], jobs[i][1], as_original): i
+                for i in pending
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    # 子进程异常退出等无法在 _process_job 内捕获的错误
+                    results[i] = {'input': jobs[i][0], 'output': None, 'error': f"{type(e).__name__}: {e}"}
+                done += 1
+                if progress is not None:
+                    progress(done, total, results[i])
+        return results
+
+
+def _run_steps(items, steps):
+    """
+    对列表执行一次遍历，依次应用所有步骤；返回新列表，无步骤时返回 None。
+    被修改的对象为副本，原列表及其中的对象保持不变。
+    """
+    if items is None or not steps:
+        return None
+    matched = {}  # 本次执行中各删除步骤已匹配的对象数
+    kept = []
+    for item in items:
+        for step in steps:
+            item = step.apply(item, matched)
+            if item is None:
+                break
+        else:
+            kept.append(item)
+    for step in steps:
+        step.finish(matched)
+    return kept
+
+
+def _process_job(pipeline: LevelPipeline, src: str, dst: str, as_original: bool) -> dict:
+    """进程池任务：处理单个文件，把异常转换为错误信息返回"""
+    try:
+        output = pipeline.process_file(src, dst, as_original)
+    except Exception as e:
+        return {'input': src, 'output': None, 'error': f"{type(e).__name__}: {e}"}
+    return {'input': src, 'output': output, 'error': None}
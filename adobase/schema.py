@@ -0,0 +1,282 @@
+# 关卡结构校验：根据 params.py 与 defaults.json 模板一次性编译出各字段的检查函数
+
+import re
+from .params import LEVEL_PARAMS
+from .defaults import defaults_data
+
+_NUMBER_TYPES = (int, float)
+# 旧版关卡用 "Enabled" / "Disabled" 表示布尔值
+_LEGACY_BOOLS = ('Enabled', 'Disabled')
+_COLOR_RE = re.compile(r'[0-9a-fA-F]{6}(?:[0-9a-fA-F]{2})?')
+_ENUM_RE = re.compile(r'[A-Za-z][A-Za-z0-9_]*')
+# 模板默认值形如枚举（大写开头的标识符）时按枚举检查；以 Tag 结尾的字段是用户自定义标签，不算枚举
+_ENUM_DEFAULT_RE = re.compile(r'[A-Z][A-Za-z0-9_]*')
+
+
+def _is_number(v) -> bool:
+    return type(v) in _NUMBER_TYPES
+
+
+def _is_bool(v) -> bool:
+    return type(v) is bool or v in _LEGACY_BOOLS
+
+
+def _is_str(v) -> bool:
+    return type(v) is str
+
+
+def _is_color(v) -> bool:
+    return type(v) is str and _COLOR_RE.fullmatch(v) is not None
+
+
+def _is_enum(v) -> bool:
+    return type(v) is str and _ENUM_RE.fullmatch(v) is not None
+
+
+def _is_list(v) -> bool:
+    return type(v) is list
+
+
+def _is_optional_number(v) -> bool:
+    return v is None or type(v) in _NUMBER_TYPES
+
+
+_CHECK_NAMES = {
+    _is_number: '数值',
+    _is_bool: '布尔值',
+    _is_str: '字符串',
+    _is_color: '颜色（6 或 8 位十六进制）',
+    _is_enum: '枚举名',
+    _is_list: '数组',
+    _is_optional_number: '数值或 null',
+}
+
+
+# 只需判断类型的检查函数：校验时先内联比较 type(value)，命中即跳过函数调用
+_FAST_TYPES = {
+    _is_number: frozenset(_NUMBER_TYPES),
+    _is_bool: frozenset((bool,)),
+    _is_str: frozenset((str,)),
+    _is_list: frozenset((list,)),
+}
+
+
+def _describe(check) -> str:
+    """检查函数的类型描述，用于错误信息"""
+    return getattr(check, 'description', None) or _CHECK_NAMES.get(check, '合法值')
+
+
+def _element_check(key: str, value):
+    """推断数组元素的检查函数"""
+    if value is None or type(value) in _NUMBER_TYPES:
+        # [null, null] 表示可留空的坐标
+        return _is_optional_number
+    return _infer_check(key, value)
+
+
+def _array_check(key: str, template: list):
+    """固定长度数组：逐个元素检查"""
+    element_checks = tuple(_element_check(key, v) for v in template)
+    size = len(element_checks)
+
+    def check(v) -> bool:
+        if type(v) is not list or len(v) != size:
+            return False
+        for element_check, element in zip(element_checks, v):
+            if not element_check(element):
+                return False
+        return True
+
+    # 描述挂在闭包上，而非写入模块级的 _CHECK_NAMES，重复编译校验器不会累积
+    check.description = f"长度为 {size} 的数组（{', '.join(_describe(c) for c in element_checks)}）"
+    return check
+
+
+def _infer_check(key: str, value):
+    """根据模板默认值推断字段的检查函数，无法推断时返回 None（不检查）"""
+    if type(value) is bool:
+        return _is_bool
+    if type(value) in _NUMBER_TYPES:
+        return _is_number
+    if type(value) is str:
+        if _COLOR_RE.fullmatch(value) and 'color' in key.lower():
+            return _is_color
+        if _ENUM_DEFAULT_RE.fullmatch(value) and not key.lower().endswith('tag'):
+            return _is_enum
+        return _is_str
+    if type(value) is list:
+        return _array_check(key, value) if value else _is_list
+    return None
+
+
+def _compile_fields(template: dict) -> dict:
+    fields = {}
+    for key, value in template.items():
+        if key in ('floor', 'eventType'):
+            continue
+        check = _infer_check(key, value)
+        if check is not None:
+            fields[key] = check
+    return fields
+
+
+def _with_fast_types(fields: dict) -> tuple:
+    """返回 (字段 -> 类型集合, 字段 -> 检查函数)"""
+    fast = {key: _FAST_TYPES[check] for key, check in fields.items() if check in _FAST_TYPES}
+    return fast, fields
+
+
+def _compile_types(templates) -> dict:
+    """按 eventType 编译模板；同一类型有多个模板时合并字段"""
+    merged = {}
+    for template in templates:
+        fields = merged.setdefault(template.get('eventType'), {})
+        for key, check in _compile_fields(template).items():
+            fields.setdefault(key, check)
+    return {item_type: _with_fast_types(fields) for item_type, fields in merged.items()}
+
+
+class LevelValidator:
+    """
+    编译后的关卡校验器。
+    由 params.py 的 LEVEL_PARAMS 与 defaults.json 中的 settings / actions / decorations 模板
+    推断每个字段的类型（数值、布尔、颜色、枚举名、字符串、定长数组），编译为检查函数。
+    校验时每个字段只做一次字典查找和一次函数调用，出错时才生成错误信息。
+    参数：
+        strict (bool): 为 True 时把未知字段、未知事件/装饰物类型也视为错误
+    """
+
+    def __init__(self, strict: bool = False):
+        self.strict = strict
+        settings_template = defaults_data.get('settings', {})
+        self.settings = _with_fast_types(_compile_fields(settings_template))
+        self.setting_names = LEVEL_PARAMS | set(settings_template)
+        self.events = _compile_types(defaults_data.get('actions', []))
+        self.decorations = _compile_types(defaults_data.get('decorations', []))
+
+    def check_settings(self, settings: dict) -> list:
+        """校验 settings 字典（或 edit_level_info 的参数），返回错误信息列表"""
+        errors = []
+        fast, checks = self.settings
+        for key, value in settings.items():
+            types = fast.get(key)
+            if types is not None and type(value) in types:
+                continue
+            check = checks.get(key)
+            if check is None:
+                if self.strict and key not in self.setting_names:
+                    errors.append(f"settings: 未知字段 {key}")
+            elif not check(value):
+                errors.append(_type_error('settings', key, check, value))
+        return errors
+
+    def check_event(self, event: dict, where: str = 'actions') -> list:
+        """校验单个事件，返回错误信息列表"""
+        errors = []
+        self._check_item(event, self.events, where, '事件', None, errors)
+        return errors
+
+    def check_decoration(self, decoration: dict, where: str = 'decorations') -> list:
+        """校验单个装饰物，返回错误信息列表"""
+        errors = []
+        self._check_item(decoration, self.decorations, where, '装饰物', None, errors)
+        return errors
+
+    def check_event_attrs(self, event_type: str, attrs: dict) -> list:
+        """校验要写入某类型事件的属性（edit_event_info / batch_edit_event 的参数）"""
+        return self._check_attrs(self.events.get(event_type, (None, None))[1], attrs, event_type)
+
+    def check_decoration_attrs(self, decoration_type: str, attrs: dict) -> list:
+        """校验要写入某类型装饰物的属性（edit_decoration_info / batch_edit_decoration 的参数）"""
+        return self._check_attrs(self.decorations.get(decoration_type, (None, None))[1], attrs, decoration_type)
+
+    def validate(self, data: dict) -> list:
+        """一次遍历校验整个关卡数据，返回错误信息列表（为空表示通过）"""
+        errors = []
+        angle_data = data.get('angleData')
+        if angle_data is not None:
+            if type(angle_data) is not list:
+                errors.append("angleData: 应为数组")
+            else:
+                for i, angle in enumerate(angle_data):
+                    if type(angle) not in _NUMBER_TYPES:
+                        errors.append(f"angleData[{i}]: 应为数值，实际为 {angle!r}")
+        elif 'pathData' not in data:
+            errors.append("缺少 angleData 或 pathData")
+        settings = data.get('settings')
+        if type(settings) is dict:
+            errors.extend(self.check_settings(settings))
+        else:
+            errors.append("settings: 应为对象")
+        for section, schemas, kind in (('actions', self.events, '事件'),
+                                       ('decorations', self.decorations, '装饰物')):
+            items = data.get(section, [])
+            if type(items) is not list:
+                errors.append(f"{section}: 应为数组")
+                continue
+            for i, item in enumerate(items):
+                if type(item) is not dict:
+                    errors.append(f"{section}[{i}]: 应为对象")
+                    continue
+                self._check_item(item, schemas, section, kind, i, errors)
+        return errors
+
+    def _check_item(self, item: dict, schemas: dict, where: str, kind: str, index, errors: list) -> None:
+        """校验单个对象，错误追加到 errors"""
+        item_type = item.get('eventType')
+        if type(item_type) is not str:
+            errors.append(f"{_location(where, index)}: eventType 应为字符串，实际为 {item_type!r}")
+        if 'floor' in item and type(item['floor']) is not int:
+            errors.append(f"{_location(where, index)}: floor 应为整数，实际为 {item['floor']!r}")
+        schema = schemas.get(item_type) if type(item_type) is str else None
+        if schema is None:
+            if self.strict and type(item_type) is str:
+                errors.append(f"{_location(where, index)}: 未知{kind}类型 {item_type}")
+            return
+        fast, checks = schema
+        for key, value in item.items():
+            types = fast.get(key)
+            if types is not None and type(value) in types:
+                continue
+            check = checks.get(key)
+            if check is None:
+                if self.strict and key not in ('floor', 'eventType'):
+                    errors.append(f"{_location(where, index)}({item_type}): 未知字段 {key}")
+            elif not check(value):
+                errors.append(_type_error(f"{_location(where, index)}({item_type})", key, check, value))
+
+    def _check_attrs(self, schema: dict, attrs: dict, item_type: str) -> list:
+        errors = []
+        if 'floor' in attrs and type(attrs['floor']) is not int:
+            errors.append(f"{item_type}: floor 应为整数，实际为 {attrs['floor']!r}")
+        if 'eventType' in attrs and type(attrs['eventType']) is not str:
+            errors.append(f"{item_type}: eventType 应为字符串，实际为 {attrs['eventType']!r}")
+        if schema is None:
+            return errors
+        for key, value in attrs.items():
+            check = schema.get(key)
+            if check is None:
+                if self.strict and key not in ('floor', 'eventType'):
+                    errors.append(f"{item_type}: 未知字段 {key}")
+            elif not check(value):
+                errors.append(_type_error(item_type, key, check, value))
+        return errors
+
+
+def _location(where: str, index: int) -> str:
+    return where if index is None else f"{where}[{index}]"
+
+
+def _type_error(where: str, key: str, check, value) -> str:
+    return f"{where}: {key} 应为{_describe(check)}，实际为 {value!r}"
+
+
+_validators = {}
+
+
+def get_validator(strict: bool = False) -> LevelValidator:
+    """获取编译好的校验器（每种模式只编译一次）"""
+    validator = _validators.get(strict)
+    if validator is None:
+        validator = _validators[strict] = LevelValidator(strict)
+    return validator
@@ -0,0 +1,155 @@
+# 关卡统计：一次遍历得到事件/装饰物/砖块的各类计数，可跨关卡合并
+
+from collections import Counter
+
+# 影响时长计算的事件类型
+TIMING_EVENT_TYPES = {'SetSpeed', 'Twirl', 'Pause'}
+# angleData 中表示中旋（midspin）的角度
+MIDSPIN_ANGLE = 999
+
+
+class LevelStats:
+    """
+    关卡统计结果。
+    属性：
+        level_count (int): 统计的关卡数（合并后为关卡总数）
+        event_count (int): 事件总数
+        decoration_count (int): 装饰物总数
+        tile_count (int): 砖块数（含 0 号起始砖块）
+        event_types (Counter): 每种 eventType 的事件数
+        floors (Counter): 每个砖块上的事件数
+        floor_event_types (Counter): 每个 (floor, eventType) 的事件数
+        decoration_types (Counter): 每种装饰物类型的数量
+        decoration_floors (Counter): 每个砖块上的装饰物数
+        angles (Counter): angleData 中各角度出现次数（旧格式关卡为 pathData 中各字符）
+        duration (float): 关卡时长（秒），无法计算时为 None；合并后为可计算时长的关卡的时长之和
+        duration_count (int): 可计算时长的关卡数，小于 level_count 时 duration 只覆盖部分关卡
+    用法：
+        total = sum((level.stats() for level in levels), LevelStats())  # 合并多个关卡
+    注意：
+        + 返回新对象；merge() 原地累加，不要对 ADOFAILevel.stats() 返回的缓存对象调用 merge()
+    """
+
+    def __init__(self):
+        self.level_count = 0
+        self.event_count = 0
+        self.decoration_count = 0
+        self.tile_count = 0
+        self.event_types = Counter()
+        self.floors = Counter()
+        self.floor_event_types = Counter()
+        self.decoration_types = Counter()
+        self.decoration_floors = Counter()
+        self.angles = Counter()
+        self.duration = None
+        self.duration_count = 0
+
+    def merge(self, other: 'LevelStats') -> 'LevelStats':
+        """把另一份统计累加到当前对象上，返回自身"""
+        self.level_count += other.level_count
+        self.event_count += other.event_count
+        self.decoration_count += other.decoration_count
+        self.tile_count += other.tile_count
+        self.event_types.update(other.event_types)
+        self.floors.update(other.floors)
+        self.floor_event_types.update(other.floor_event_types)
+        self.decoration_types.update(other.decoration_types)
+        self.decoration_floors.update(other.decoration_floors)
+        self.angles.update(other.angles)
+        if other.duration is not None:
+            self.duration = (self.duration or 0) + other.duration
+        self.duration_count += other.duration_count
+        return self
+
+    def copy(self) -> 'LevelStats':
+        return LevelStats().merge(self)
+
+    def __add__(self, other: 'LevelStats') -> 'LevelStats':
+        if not isinstance(other, LevelStats):
+            return NotImplemented
+        return self.copy().merge(other)
+
+    def __repr__(self):
+        return (f"LevelStats(levels={self.level_count}, events={self.event_count}, "
+                f"decorations={self.decoration_count}, tiles={self.tile_count}, duration={self.duration}, "
+                f"duration_count={self.duration_count})")
+
+
+def compute_level_stats(data: dict) -> LevelStats:
+    """对关卡数据做一次遍历，返回 LevelStats"""
+    stats = LevelStats()
+    stats.level_count = 1
+
+    actions = data.get('actions', [])
+    floor_event_types = stats.floor_event_types
+    timing_events = []
+    for action in actions:
+        event_type = action.get('eventType')
+        floor = action.get('floor')
+        floor_event_types[(floor, event_type)] += 1
+        if event_type in TIMING_EVENT_TYPES:
+            timing_events.append(action)
+    for (floor, event_type), n in floor_event_types.items():
+        stats.floors[floor] += n
+        stats.event_types[event_type] += n
+    stats.event_count = len(actions)
+
+    decorations = data.get('decorations', [])
+    for deco in decorations:
+        stats.decoration_types[deco.get('eventType')] += 1
+        stats.decoration_floors[deco.get('floor')] += 1
+    stats.decoration_count = len(decorations)
+
+    angle_data = data.get('angleData')
+    if angle_data is not None:
+        stats.angles.update(angle_data)
+        stats.tile_count = len(angle_data) + 1
+        stats.duration = _compute_duration(angle_data, data.get('settings', {}), timing_events)
+        if stats.duration is not None:
+            stats.duration_count = 1
+    elif 'pathData' in data:
+        stats.angles.update(data['pathData'])
+        stats.tile_count = len(data['pathData']) + 1
+    return stats
+
+
+def _compute_duration(angle_data, settings: dict, timing_events) -> float:
+    """
+    按 angleData 估算关卡时长（秒）。
+    每段路径的拍数 = 两段方向的夹角 / 180，考虑中旋、Twirl 反向、SetSpeed 变速与 Pause 暂停。
+    """
+    bpm = settings.get('bpm')
+    if not bpm:
+        return None
+    # bpm 为曲目原速，实际时长还需按 pitch 缩放
+    speed = (settings.get('pitch', 100) or 100) / 100
+
+    events_by_floor = {}
+    for action in timing_events:
+        events_by_floor.setdefault(action.get('floor'), []).append(action)
+
+    seconds = 0.0
+    clockwise = True
+    prev_angle = 0
+    for floor, angle in enumerate(angle_data):
+        for action in events_by_floor.get(floor, ()):
+            event_type = action.get('eventType')
+            if event_type == 'Twirl':
+                clockwise = not clockwise
+            elif event_type == 'SetSpeed':
+                if action.get('speedType', 'Bpm') == 'Multiplier':
+                    bpm *= action.get('bpmMultiplier', 1)
+                else:
+                    bpm = action.get('beatsPerMinute', bpm)
+            elif event_type == 'Pause':
+                seconds += action.get('duration', 0) * 60 / (bpm * speed)
+        if angle == MIDSPIN_ANGLE:
+            # 中旋：不消耗时间，行进方向反转
+            prev_angle = (prev_angle + 180) % 360
+            continue
+        delta = (180 + prev_angle - angle) % 360
+        if not clockwise:
+            delta = (360 - delta) % 360
+        seconds += (delta or 360) / 180 * 60 / (bpm * speed)
+        prev_angle = angle
+    return seconds
@@ -0,0 +1,312 @@
+# 流式读取：不构建完整文档，逐个产出 actions / decorations 中的对象
+
+import itertools
+import json
+import re
+from .utils import parse_adofai_to_json_str
+
+# 读取块大小（字符数），通用解析时按块读入
+CHUNK_SIZE = 1 << 16
+# 判断文件布局时读取的开头长度（字符数）
+SNIFF_SIZE = 1 << 12
+
+# 通用解析用的“有意义字符”：字符串外只关心括号、引号；根对象层还需要逗号来区分键和值
+_STRUCT_CHARS = re.compile(r'["{}\[\]]')
+_STRUCT_CHARS_ROOT = re.compile(r'["{}\[\],]')
+_STRING_CHARS = re.compile(r'["\\]')
+
+
+def iter_events(filepath: str, event_type: str = None):
+    """
+    流式遍历关卡中的事件（actions），不把整个关卡载入内存。
+    参数：
+        filepath (str): .adofai 文件路径
+        event_type (str, 可选): 只产出该类型的事件
+    返回：
+        生成器，每次产出一个事件字典
+    用法：
+        for event in iter_events('main.adofai', 'Twirl'):
+            print(event['floor'])
+    """
+    return _iter_array_items(filepath, 'actions', event_type)
+
+
+def iter_decorations(filepath: str, decoration_type: str = None):
+    """
+    流式遍历关卡中的装饰物（decorations），不把整个关卡载入内存。
+    参数：
+        filepath (str): .adofai 文件路径
+        decoration_type (str, 可选): 只产出该类型的装饰物
+    返回：
+        生成器，每次产出一个装饰物字典
+    """
+    return _iter_array_items(filepath, 'decorations', decoration_type)
+
+
+def _iter_array_items(filepath: str, key: str, item_type: str = None):
+    """按行快速解析 adofai 风格布局，遇到其他布局时退回通用的分块解析"""
+    # 按类型过滤时先做子串预筛，跳过明显不匹配的对象（非 ASCII 类型名可能被转义，不做预筛）
+    type_token = json.dumps(item_type) if item_type is not None and item_type.isascii() else None
+    with open(filepath, 'r', encoding='utf-8-sig') as f:
+        # 只读取有限长度的开头判断布局，压缩成一行的文件也不会整体读入
+        prefix = f.read(SNIFF_SIZE)
+        reader = _PrefixedReader(f, prefix)
+        if _is_adofai_layout(prefix):
+            # Tab 缩进、根字段位于第一层：to_adofai_style_json 与 ADOFAI 编辑器的布局
+            head = _find_array_line(reader, key)
+            if head is None:
+                return
+            if head:
+                # 数组与首个对象同行，改用通用解析
+                texts = _scan_array_texts(itertools.chain([head], _read_chunks(reader)), key, inside=True)
+                items = _parse_texts(texts, type_token)
+            else:
+                items = _read_oneline_items(reader, type_token)
+        else:
+            items = _parse_texts(_scan_array_texts(_read_chunks(reader), key), type_token)
+        for item in items:
+            if item_type is None or item.get('eventType') == item_type:
+                yield item
+
+
+def _is_adofai_layout(prefix: str) -> bool:
+    lines = prefix.split('\n', 2)
+    return len(lines) > 1 and lines[0].strip() == '{' and lines[1].startswith('\t"')
+
+
+class _PrefixedReader:
+    """先返回已读取的开头部分，再继续读取文件"""
+
+    def __init__(self, f, prefix: str):
+        self.f = f
+        self.buf = prefix
+
+    def readline(self, limit: int = -1) -> str:
+        """读取一行，limit 不为负时最多读取 limit 个字符"""
+        if not self.buf:
+            return self.f.readline(limit)
+        i = self.buf.find('\n')
+        end = i + 1 if i >= 0 else len(self.buf)
+        if limit >= 0:
+            end = min(end, limit)
+        line, self.buf = self.buf[:end], self.buf[end:]
+        if self.buf or line.endswith('\n'):
+            return line
+        if limit < 0:
+            return line + self.f.readline()
+        return line + self.f.readline(limit - len(line)) if len(line) < limit else line
+
+    def read(self, size: int) -> str:
+        if not self.buf:
+            return self.f.read(size)
+        chunk, self.buf = self.buf, ''
+        return chunk
+
+    def __iter__(self):
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            yield line
+
+
+def _find_array_line(reader: _PrefixedReader, key: str):
+    """
+    在 adofai 风格文件中定位根对象下的 key 数组。
+    返回 None 表示没有该数组（或为空数组），返回 '' 表示已定位到 '[' 之后。
+    按 SNIFF_SIZE 分段读取行：angleData 等根字段写在一行，长度随砖块数增长，不整行读入。
+    """
+    key_prefix = f'\t"{key}":'
+    line_start = True
+    while True:
+        line = reader.readline(SNIFF_SIZE)
+        if not line:
+            return None
+        matched = line_start and line.startswith(key_prefix)
+        line_start = line.endswith('\n')
+        if matched:
+            break
+    rest, complete = _read_line_head(reader, line[len(key_prefix):], complete=line_start)
+    if complete and not rest.strip():
+        # ADOFAI 编辑器的写法："actions": 与 [ 分两行
+        rest, complete = _read_line_head(reader, reader.readline(SNIFF_SIZE))
+    # 行被截断时不是单独的 '['，也不是完整的空数组；截断处可能位于字符串中间，只去掉开头空白
+    rest = rest.strip() if complete else rest.lstrip()
+    if complete and rest == '[':
+        return ''
+    if complete and rest.startswith('[') and rest.rstrip(',').endswith(']'):
+        return None
+    # 其他写法（如数组与首个对象同行）交给通用解析
+    return rest[1:] if rest.startswith('[') else None
+
+
+def _read_line_head(reader: _PrefixedReader, text: str, complete: bool = None):
+    """继续读取当前行，直到行尾或至少 SNIFF_SIZE 个字符；返回 (文本, 是否读到行尾)"""
+    if complete is None:
+        complete = text.endswith('\n')
+    while not complete and len(text) < SNIFF_SIZE:
+        more = reader.readline(SNIFF_SIZE)
+        text += more
+        complete = not more or more.endswith('\n')
+    return text, complete
+
+
+def _read_oneline_items(reader: _PrefixedReader, type_token: str = None):
+    """逐行解析数组中的对象（每行一个对象），遇到不是恰好一个对象的行时从该行起退回通用解析"""
+    for line in reader:
+        text = line.strip()
+        if text.startswith(']'):
+            return
+        if not text:
+            continue
+        item_text = text[:-1].rstrip() if text.endswith(',') else text
+        if type_token is not None and type_token not in item_text and _is_complete(item_text):
+            continue
+        try:
+            item = json.loads(item_text)
+        except json.JSONDecodeError:
+            item = _parse_item(item_text) if _is_complete(item_text) else None
+        if type(item) is dict:
+            yield item
+        else:
+            # 一行多个对象、对象跨行等情况
+            texts = _scan_array_texts(itertools.chain([line], _read_chunks(reader)), None, inside=True)
+            yield from _parse_texts(texts, type_token)
+            return
+
+
+def _parse_texts(texts, type_token: str = None):
+    for text in texts:
+        if type_token is not None and type_token not in text:
+            continue
+        yield _parse_item(text)
+
+
+def _is_complete(text: str) -> bool:
+    """判断单行文本是否恰好是一个完整对象（字符串外括号配平且只在末尾闭合）"""
+    depth = 0
+    in_string = False
+    pos = 0
+    while True:
+        if in_string:
+            m = _STRING_CHARS.search(text, pos)
+            if m is None:
+                return False
+            if m.group() == '\\':
+                pos = m.end() + 1
+                continue
+            in_string = False
+            pos = m.end()
+            continue
+        m = _STRUCT_CHARS.search(text, pos)
+        if m is None:
+            return False
+        c = m.group()
+        pos = m.end()
+        if c == '"':
+            in_string = True
+        elif c in '{[':
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return pos == len(text)
+
+
+def _parse_item(text: str) -> dict:
+    """解析单个对象文本，兼容尾随逗号"""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return json.loads(parse_adofai_to_json_str(text))
+
+
+def _read_chunks(f):
+    """按 CHUNK_SIZE 分块读取"""
+    while True:
+        chunk = f.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _scan_array_texts(chunks, key: str, inside: bool = False):
+    """
+    通用的分块解析：在任意 JSON 布局中找到根对象下 key 对应的数组，逐个产出其中对象的原始文本。
+    只保留当前对象的文本，内存占用与单个对象大小相关，与文件大小无关。
+    参数：
+        chunks: 文本块迭代器
+        key (str): 根对象下的数组字段名
+        inside (bool): 为 True 时表示 chunks 已位于目标数组内部（'[' 之后）
+    """
+    buf = ''
+    pos = 0
+    depth = 2 if inside else 0
+    in_target = inside
+    in_string = False
+    expect_key = False
+    last_key = None
+    str_start = None
+    item_start = None
+    for chunk in chunks:
+        buf += chunk
+        while True:
+            if in_string:
+                m = _STRING_CHARS.search(buf, pos)
+                if m is None:
+                    pos = len(buf)
+                    break
+                if m.group() == '\\':
+                    if m.end() >= len(buf):
+                        # 转义符落在块末尾，等待下一块
+                        pos = m.start()
+                        break
+                    pos = m.end() + 1
+                    continue
+                in_string = False
+                pos = m.end()
+                if depth == 1 and expect_key:
+                    last_key = buf[str_start:m.start()]
+                    expect_key = False
+                continue
+            pattern = _STRUCT_CHARS_ROOT if depth == 1 else _STRUCT_CHARS
+            m = pattern.search(buf, pos)
+            if m is None:
+                pos = len(buf)
+                break
+            c = m.group()
+            pos = m.end()
+            if c == '"':
+                in_string = True
+                str_start = pos
+            elif c == ',':
+                expect_key = True
+            elif c in '{[':
+                depth += 1
+                if depth == 1:
+                    expect_key = True
+                elif depth == 2 and c == '[' and last_key == key:
+                    in_target = True
+                elif depth == 3 and in_target and c == '{':
+                    item_start = m.start()
+            else:
+                depth -= 1
+                if in_target:
+                    if depth == 2 and item_start is not None:
+                        yield buf[item_start:pos]
+                        item_start = None
+                    elif depth == 1:
+                        return
+        # 丢弃已处理的文本，只保留未完成的对象或字符串
+        keep = pos
+        if item_start is not None:
+            keep = min(keep, item_start)
+        if in_string and str_start is not None:
+            keep = min(keep, str_start)
+        if keep:
+            buf = buf[keep:]
+            pos -= keep
+            if item_start is not None:
+                item_start -= keep
+            if str_start is not None:
+                str_start -= keep
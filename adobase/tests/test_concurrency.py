@@ -0,0 +1,214 @@
+import copy
+import json
+import threading
+import time
+
+import pytest
+
+from adobase import ADOFAILevel, LevelPipeline, RWLock
+from adobase.defaults import defaults_data
+
+MUTATIONS = {
+    'edit_level_info': lambda level: level.edit_level_info(bpm=200),
+    'edit_event_info': lambda level: level.edit_event_info(1, 'SetSpeed', 0, beatsPerMinute=999),
+    'batch_edit_event': lambda level: level.batch_edit_event('SetSpeed', beatsPerMinute=1),
+    'add_event': lambda level: level.add_event(1, 'Twirl'),
+    'remove_event': lambda level: level.remove_event(1, 'Twirl'),
+    'edit_decoration_info': lambda level: level.edit_decoration_info(13, 'AddDecoration', 0, tag='x'),
+    'batch_edit_decoration': lambda level: level.batch_edit_decoration('AddDecoration', tag='y'),
+    'add_decoration': lambda level: level.add_decoration(13, 'AddDecoration', tag='z'),
+    'remove_decoration': lambda level: level.remove_decoration(13, 'AddDecoration'),
+    'pipeline.apply': lambda level: (LevelPipeline()
+                                     .edit_level_info(bpm=200)
+                                     .batch_edit_event('SetSpeed', beatsPerMinute=1)
+                                     .remove_event(1, 'Twirl')
+                                     .batch_edit_decoration('AddDecoration', tag='y')).apply(level),
+}
+
+
+def make_level(concurrent=False):
+    return ADOFAILevel(json.loads(json.dumps(defaults_data)), concurrent=concurrent)
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "等待超时"
+        time.sleep(0.001)
+
+
+def test_read_reentrant():
+    lock = RWLock()
+    with lock.read():
+        with lock.read():
+            pass
+        assert lock._readers
+    assert not lock._readers
+    with pytest.raises(RuntimeError):
+        lock.release_read()
+
+
+def test_writer_reenters_write_and_read():
+    lock = RWLock()
+    with lock.write():
+        with lock.write():
+            with lock.read():
+                pass
+        assert lock._writer == threading.get_ident()
+    assert lock._writer is None
+    with pytest.raises(RuntimeError):
+        lock.release_write()
+
+
+def test_read_to_write_upgrade_raises():
+    lock = RWLock()
+    with lock.read():
+        with pytest.raises(RuntimeError):
+            lock.acquire_write()
+    # 升级失败后锁仍可正常使用
+    with lock.write():
+        pass
+
+
+def test_writer_preference():
+    lock = RWLock()
+    order = []
+    lock.acquire_read()
+
+    def writer():
+        with lock.write():
+            order.append('writer')
+            time.sleep(0.05)
+
+    def reader():
+        with lock.read():
+            order.append('reader')
+
+    w = threading.Thread(target=writer)
+    w.start()
+    wait_until(lambda: lock._waiting_writers == 1)
+    r = threading.Thread(target=reader)
+    r.start()
+    # 有写线程在等待时，新的读线程不能插队
+    time.sleep(0.05)
+    assert order == []
+    lock.release_read()
+    w.join(5)
+    r.join(5)
+    assert order == ['writer', 'reader']
+
+
+@pytest.mark.parametrize('name', MUTATIONS)
+def test_snapshot_unchanged_after_mutation(name):
+    level = make_level()
+    snap = level.snapshot()
+    before = copy.deepcopy(snap.data)
+    MUTATIONS[name](level)
+    assert level.data != before
+    assert snap.data == before
+    assert level.snapshot() is not snap
+    assert level.snapshot().data == level.data
+
+
+@pytest.mark.parametrize('name', MUTATIONS)
+def test_snapshot_unchanged_after_repeated_mutations(name):
+    # 整段替换后未修改的对象仍与旧快照共享，之后的原地修改也不能影响旧快照
+    level = make_level()
+    snap = level.snapshot()
+    before = copy.deepcopy(snap.data)
+    for mutate in (MUTATIONS[name], *MUTATIONS.values()):
+        try:
+            mutate(level)
+        except IndexError:
+            pass
+    assert snap.data == before
+
+
+@pytest.mark.parametrize('name', MUTATIONS)
+def test_mutation_on_snapshot_raises(name):
+    level = make_level()
+    snap = level.snapshot()
+    before = copy.deepcopy(snap.data)
+    with pytest.raises(TypeError):
+        MUTATIONS[name](snap)
+    assert snap.data == before
+    assert snap.version == level.version
+
+
+def test_pipeline_apply_takes_write_lock():
+    level = make_level(concurrent=True)
+    done = threading.Event()
+
+    def apply():
+        MUTATIONS['pipeline.apply'](level)
+        done.set()
+
+    with level.lock.read():
+        t = threading.Thread(target=apply)
+        t.start()
+        wait_until(lambda: level.lock._waiting_writers == 1)
+        assert not done.is_set()
+    t.join(5)
+    assert done.is_set()
+    assert level.get_level_info('bpm') == 200
+
+
+def test_concurrent_readers_and_writers():
+    level = make_level(concurrent=True)
+    initial = level.get_event_count()
+    errors = []
+
+    def writer():
+        for _ in range(50):
+            level.add_event(1, 'Twirl')
+
+    def reader():
+        try:
+            for _ in range(50):
+                snap = level.snapshot()
+                count = snap.get_event_count()
+                assert snap.get_event_count() == count == len(snap.data['actions'])
+        except AssertionError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer) for _ in range(4)] + [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(30)
+    assert not errors
+    assert level.get_event_count() == initial + 200
+
+
+def test_level_info_view_not_changed_by_later_writes():
+    level = make_level(concurrent=True)
+    info = level.get_level_info()
+    bpm, pitch = info['bpm'], info['pitch']
+    level.edit_level_info(bpm=999, pitch=50)
+    assert (info['bpm'], info['pitch']) == (bpm, pitch)
+    assert level.get_level_info('bpm') == 999
+    # 没有新视图时，后续修改不再复制 settings
+    settings = level.data['settings']
+    level.edit_level_info(bpm=998)
+    assert level.data['settings'] is settings
+
+
+@pytest.mark.parametrize('add, remove, edit', [
+    (lambda level: level.add_event(1, 'Twirl'), lambda level: level.remove_event(1, 'Twirl'),
+     lambda level: level.batch_edit_event('SetSpeed', beatsPerMinute=1)),
+    (lambda level: level.add_decoration(13, 'AddDecoration', tag='z'),
+     lambda level: level.remove_decoration(13, 'AddDecoration', 0),
+     lambda level: level.batch_edit_decoration('AddDecoration', tag='y')),
+])
+def test_add_and_remove_copy_list_only(add, remove, edit):
+    level = make_level()
+    snap = level.snapshot()
+    before = copy.deepcopy(snap.data)
+    shared = {id(item) for section in ('actions', 'decorations') for item in snap.data[section]}
+    remove(level)
+    add(level)
+    # 增删只复制列表，除新添加的对象外都仍与快照共享
+    items = [item for section in ('actions', 'decorations') for item in level.data[section]]
+    assert sum(id(item) not in shared for item in items) == 1
+    edit(level)
+    assert snap.data == before
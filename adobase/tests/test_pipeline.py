@@ -0,0 +1,221 @@
+import copy
+import json
+import os
+import random
+import stat
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from adobase import ADOFAILevel, LevelPipeline
+from adobase.utils import to_adofai_style_json
+
+EVENT_TYPES = ['Twirl', 'SetSpeed', 'MoveTrack', 'PositionTrack']
+DECORATION_TYPES = ['AddDecoration', 'AddText']
+
+
+def make_data(rng):
+    return {
+        'angleData': [0] * 8,
+        'settings': {'bpm': 100, 'song': ''},
+        'actions': [{'floor': rng.randrange(6), 'eventType': rng.choice(EVENT_TYPES), 'n': i} for i in range(30)],
+        'decorations': [{'floor': rng.randrange(6), 'eventType': rng.choice(DECORATION_TYPES), 'n': i} for i in range(10)],
+    }
+
+
+def random_step(rng):
+    floor = rng.choice([None, rng.randrange(7)])
+    index = rng.choice([None, None, rng.randrange(-1, 3)])
+    decoration = rng.random() < 0.3
+    item_type = rng.choice([None, rng.choice(DECORATION_TYPES if decoration else EVENT_TYPES)])
+    kind = rng.choice(['edit', 'edit', 'remove', 'info'])
+    if kind == 'info':
+        return 'edit_level_info', (), {'bpm': rng.randrange(60, 240)}
+    edit_type = item_type or rng.choice(DECORATION_TYPES if decoration else EVENT_TYPES)
+    attrs = {'floor': floor, 'x': rng.randrange(100)}
+    if rng.random() < 0.2:
+        # 修改 eventType 会影响后续步骤的匹配
+        attrs['eventType'] = rng.choice(DECORATION_TYPES if decoration else EVENT_TYPES)
+    if decoration:
+        if kind == 'edit':
+            return 'batch_edit_decoration', (edit_type,), attrs
+        return 'remove_decoration', (floor, item_type, index), {}
+    if kind == 'edit':
+        return 'batch_edit_event', (edit_type,), attrs
+    return 'remove_event', (floor, item_type, index), {}
+
+
+def run_sequential(data, steps):
+    level = ADOFAILevel(data)
+    for name, args, kwargs in steps:
+        getattr(level, name)(*args, **kwargs)
+    return level.data
+
+
+def build_pipeline(steps):
+    pipeline = LevelPipeline()
+    for name, args, kwargs in steps:
+        getattr(pipeline, name)(*args, **kwargs)
+    return pipeline
+
+
+@pytest.mark.parametrize('seed', range(300))
+def test_matches_sequential_calls(seed):
+    rng = random.Random(seed)
+    data = make_data(rng)
+    steps = [random_step(rng) for _ in range(rng.randrange(1, 6))]
+    original = copy.deepcopy(data)
+    try:
+        expected = run_sequential(copy.deepcopy(data), steps)
+    except (IndexError, KeyError) as e:
+        expected = type(e)
+    level = ADOFAILevel(data)
+    pipeline = build_pipeline(steps)
+    if isinstance(expected, type):
+        with pytest.raises(expected):
+            pipeline.apply(level)
+        # 出错时关卡保持不变
+        assert level.data == original
+    else:
+        pipeline.apply(level)
+        assert level.data == expected
+
+
+@pytest.mark.parametrize('steps, expected_len', [
+    ([('remove_event', (1, None, 0), {}), ('remove_event', (1, None, 0), {})], 2),
+    ([('remove_event', (None, 'Twirl', 1), {})], 3),
+    ([('remove_event', (), {}), ('batch_edit_event', ('Twirl',), {'x': 1})], 0),
+])
+def test_index_removals(steps, expected_len):
+    data = {'settings': {}, 'actions': [
+        {'floor': 1, 'eventType': 'Twirl'}, {'floor': 1, 'eventType': 'SetSpeed'},
+        {'floor': 1, 'eventType': 'Twirl'}, {'floor': 2, 'eventType': 'Twirl'},
+    ]}
+    expected = run_sequential(copy.deepcopy(data), steps)
+    level = build_pipeline(steps).apply(ADOFAILevel(data))
+    assert level.data == expected
+    assert len(level.data['actions']) == expected_len
+
+
+@pytest.mark.parametrize('steps', [
+    [('remove_event', (1, 'Twirl'), {})],
+    [('remove_event', (None, None, 0), {})],
+    [('remove_event', (), {})],
+    [('batch_edit_event', ('Twirl',), {'x': 1})],
+    [('remove_decoration', (1,), {})],
+    [('batch_edit_decoration', ('AddDecoration',), {'x': 1}), ('remove_decoration', (), {})],
+])
+def test_missing_sections(steps):
+    data = {'settings': {'bpm': 100}}
+    try:
+        expected = run_sequential(copy.deepcopy(data), steps)
+    except IndexError:
+        expected = IndexError
+    level = ADOFAILevel(copy.deepcopy(data))
+    if expected is IndexError:
+        with pytest.raises(IndexError):
+            build_pipeline(steps).apply(level)
+        assert level.data == data
+    else:
+        assert build_pipeline(steps).apply(level).data == expected
+
+def test_failed_step_leaves_level_unchanged():
+    data = {'settings': {'bpm': 100}, 'actions': [
+        {'floor': 2, 'eventType': 'Twirl'}, {'floor': 3, 'eventType': 'Twirl'},
+    ], 'decorations': [{'floor': 1, 'eventType': 'AddDecoration'}]}
+    original = copy.deepcopy(data)
+    pipeline = (LevelPipeline().edit_level_info(bpm=200).remove_event(2)
+                .batch_edit_event('Twirl', x=1).remove_event(3, 'SetSpeed'))
+    level = ADOFAILevel(data)
+    with pytest.raises(IndexError):
+        pipeline.apply(level)
+    assert level.data == original
+    pipeline = LevelPipeline().batch_edit_event('Twirl', x=1).remove_decoration(5)
+    with pytest.raises(IndexError):
+        pipeline.apply(level)
+    assert level.data == original
+
+
+def test_run_with_process_pool(tmp_path):
+    data = make_data(random.Random(0))
+    data['actions'].append({'floor': 1, 'eventType': 'Twirl'})
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'b').mkdir()
+    good = [str(tmp_path / f'level{i}.adofai') for i in range(3)]
+    for path in good:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(to_adofai_style_json(data))
+    bad = str(tmp_path / 'bad.adofai')
+    with open(bad, 'w', encoding='utf-8') as f:
+        f.write('{oops')
+    no_match = str(tmp_path / 'no_match.adofai')
+    with open(no_match, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(dict(data, actions=[])))
+    same_name = [str(tmp_path / d / 'x.adofai') for d in ('a', 'b')]
+    for path in same_name:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(to_adofai_style_json(data))
+    out = tmp_path / 'out'
+    progress = []
+    pipeline = LevelPipeline().edit_level_info(bpm=180).remove_event(event_type='Twirl')
+    inputs = good + [bad, str(tmp_path / 'missing.adofai'), no_match] + same_name
+    results = pipeline.run(inputs, output_dir=str(out), max_workers=2,
+                           progress=lambda done, total, result: progress.append((done, total)))
+
+    assert [r['input'] for r in results] == inputs
+    assert sorted(progress) == [(i, len(inputs)) for i in range(1, len(inputs) + 1)]
+    expected = run_sequential(copy.deepcopy(data), [('edit_level_info', (), {'bpm': 180}),
+                                                    ('remove_event', (None, 'Twirl', None), {})])
+    for result in results[:3]:
+        assert result['error'] is None
+        assert ADOFAILevel.load(result['output']).data == expected
+    assert results[3]['error'].startswith('JSONDecodeError')
+    assert results[4]['error'].startswith('FileNotFoundError')
+    assert results[5]['error'].startswith('IndexError')
+    for result in results[6:]:
+        assert result['output'] is None and '输出路径冲突' in result['error']
+    assert sorted(p.name for p in out.iterdir()) == [f'level{i}.adofai' for i in range(3)]
+
+
+
+def test_shared_pipeline_across_threads():
+    # 同一流水线在多个线程中同时处理不同关卡，删除步骤的计数互不干扰
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        data = {'settings': {}, 'actions': [{'floor': i % 3, 'eventType': 'Twirl'} for i in range(3000)]}
+        steps = [('remove_event', (1, 'Twirl', 500), {}), ('remove_event', (None, 'Twirl', 1200), {})]
+        expected = run_sequential(copy.deepcopy(data), steps)
+        pipeline = build_pipeline(steps)
+        barrier = threading.Barrier(8)
+
+        def work():
+            barrier.wait()
+            return [pipeline.apply(ADOFAILevel(copy.deepcopy(data))).data for _ in range(5)]
+
+        with ThreadPoolExecutor(8) as executor:
+            results = [r for f in [executor.submit(work) for _ in range(8)] for r in f.result()]
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert all(r == expected for r in results)
+
+@pytest.mark.skipif(os.name != 'posix', reason='只在 POSIX 上检查文件权限')
+def test_run_keeps_file_mode(tmp_path):
+    data = make_data(random.Random(0))
+    src = tmp_path / 'a.adofai'
+    src.write_text(to_adofai_style_json(data), encoding='utf-8')
+    os.chmod(src, 0o640)
+    old_umask = os.umask(0o022)
+    try:
+        pipeline = LevelPipeline().edit_level_info(bpm=150)
+        # 覆盖输入文件时保留原权限
+        assert pipeline.run([str(src)], max_workers=1)[0]['error'] is None
+        assert stat.S_IMODE(os.stat(src).st_mode) == 0o640
+        # 新建输出文件时按 umask 设置权限
+        result = pipeline.run([str(src)], output_dir=str(tmp_path / 'out'), max_workers=1)[0]
+        assert stat.S_IMODE(os.stat(result['output']).st_mode) == 0o644
+    finally:
+        os.umask(old_umask)
+    assert ADOFAILevel.load(str(src)).get_level_info('bpm') == 150
@@ -0,0 +1,109 @@
+import copy
+import json
+
+import pytest
+
+from adobase import ADOFAILevel, LevelPipeline, LevelValidator
+from adobase.defaults import defaults_data
+from adobase.schema import _CHECK_NAMES, get_validator
+
+
+def make_data():
+    return json.loads(json.dumps(defaults_data))
+
+
+def first(data, section, item_type):
+    return next(item for item in data[section] if item['eventType'] == item_type)
+
+
+@pytest.mark.parametrize('strict', [False, True])
+def test_defaults_validate_cleanly(strict):
+    assert ADOFAILevel(make_data()).validate(strict) == []
+
+
+@pytest.mark.parametrize('mutate, message', [
+    (lambda d: d['settings'].update(bpm='x'), "settings: bpm 应为数值，实际为 'x'"),
+    (lambda d: d['settings'].update(trackColor='red'), "settings: trackColor 应为颜色"),
+    (lambda d: d['settings'].update(specialArtistType='not an enum'), "settings: specialArtistType 应为枚举名"),
+    (lambda d: d['settings'].update(legacyFlash=1), "settings: legacyFlash 应为布尔值"),
+    (lambda d: first(d, 'actions', 'MoveCamera').update(position=[1, 2, 3]),
+     "MoveCamera): position 应为长度为 2 的数组（数值或 null, 数值或 null），实际为 [1, 2, 3]"),
+    (lambda d: first(d, 'actions', 'SetSpeed').update(beatsPerMinute='fast'), "SetSpeed): beatsPerMinute 应为数值"),
+    (lambda d: first(d, 'actions', 'SetSpeed').update(floor='1'), "actions[0]: floor 应为整数"),
+    (lambda d: first(d, 'decorations', 'AddDecoration').update(color='fff'), "AddDecoration): color 应为颜色"),
+    (lambda d: first(d, 'decorations', 'AddDecoration').update(scale=[100]), "AddDecoration): scale 应为长度为 2 的数组"),
+    (lambda d: d['angleData'].append('x'), "angleData["),
+    (lambda d: d.pop('angleData'), "缺少 angleData 或 pathData"),
+])
+def test_type_errors(mutate, message):
+    data = make_data()
+    mutate(data)
+    for strict in (False, True):
+        errors = ADOFAILevel(data).validate(strict)
+        assert len(errors) == 1 and message in errors[0], errors
+
+
+def test_legacy_bools_and_nullable_position():
+    data = make_data()
+    data['settings']['legacyFlash'] = 'Enabled'
+    first(data, 'actions', 'MoveCamera')['position'] = [1.5, None]
+    assert ADOFAILevel(data).validate() == []
+
+
+@pytest.mark.parametrize('mutate, message', [
+    (lambda d: d['settings'].update(notASetting=1), "settings: 未知字段 notASetting"),
+    (lambda d: first(d, 'actions', 'SetSpeed').update(extra=1), "actions[0](SetSpeed): 未知字段 extra"),
+    (lambda d: d['actions'].append({'floor': 1, 'eventType': 'NoSuchEvent'}), "未知事件类型 NoSuchEvent"),
+    (lambda d: d['decorations'].append({'floor': 1, 'eventType': 'NoSuchDeco'}), "未知装饰物类型 NoSuchDeco"),
+])
+def test_strict_unknowns(mutate, message):
+    data = make_data()
+    mutate(data)
+    level = ADOFAILevel(data)
+    assert level.validate() == []
+    errors = level.validate(strict=True)
+    assert len(errors) == 1 and message in errors[0], errors
+
+
+INVALID_WRITES = {
+    'edit_level_info': lambda level: level.edit_level_info(bpm='x'),
+    'edit_event_info': lambda level: level.edit_event_info(1, 'SetSpeed', 0, beatsPerMinute='x'),
+    'batch_edit_event': lambda level: level.batch_edit_event('MoveCamera', position=[1, 2, 3]),
+    'add_event': lambda level: level.add_event(2, 'SetSpeed', beatsPerMinute='x'),
+    'edit_decoration_info': lambda level: level.edit_decoration_info(13, 'AddDecoration', 0, color='red'),
+    'batch_edit_decoration': lambda level: level.batch_edit_decoration('AddDecoration', opacity='x'),
+    'add_decoration': lambda level: level.add_decoration(2, 'AddDecoration', scale=[1]),
+    'pipeline.apply': lambda level: (LevelPipeline().remove_event(1, 'Twirl')
+                                     .batch_edit_event('MoveCamera', position=[1, 2, 3])).apply(level),
+}
+
+
+@pytest.mark.parametrize('name', INVALID_WRITES)
+def test_validate_on_write_rejects(name):
+    data = make_data()
+    level = ADOFAILevel(copy.deepcopy(data), validate_on_write=True)
+    with pytest.raises(ValueError):
+        INVALID_WRITES[name](level)
+    assert level.data == data
+    # 未开启时照常写入
+    level = ADOFAILevel(copy.deepcopy(data))
+    INVALID_WRITES[name](level)
+    assert level.data != data
+
+
+def test_validate_on_write_accepts_valid_values():
+    level = ADOFAILevel(make_data(), validate_on_write=True)
+    level.edit_level_info(bpm=120, trackColor='ff0000')
+    level.batch_edit_event('MoveCamera', position=[1, None])
+    level.add_decoration(2, 'AddDecoration', scale=[50, 50])
+    LevelPipeline().edit_level_info(bpm=150).batch_edit_decoration('AddDecoration', opacity=50).apply(level)
+    assert level.validate() == []
+    assert level.get_level_info('bpm') == 150
+
+
+def test_validators_do_not_accumulate_descriptions():
+    count = len(_CHECK_NAMES)
+    for _ in range(5):
+        LevelValidator()
+    assert len(_CHECK_NAMES) == count
+    assert get_validator() is get_validator()
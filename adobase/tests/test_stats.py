@@ -0,0 +1,58 @@
+from adobase import ADOFAILevel, LevelStats
+
+
+def make_level(**settings):
+    return ADOFAILevel({
+        'angleData': [0, 0, 0, 0],
+        'settings': dict({'bpm': 120, 'pitch': 100}, **settings),
+        'actions': [{'floor': 1, 'eventType': 'Twirl'}, {'floor': 1, 'eventType': 'Twirl'},
+                    {'floor': 2, 'eventType': 'SetSpeed', 'speedType': 'Bpm', 'beatsPerMinute': 60}],
+        'decorations': [{'floor': 1, 'eventType': 'AddDecoration'}],
+    })
+
+
+def test_counts():
+    stats = make_level().stats()
+    assert stats.event_count == 3 and stats.decoration_count == 1 and stats.tile_count == 5
+    assert stats.event_types == {'Twirl': 2, 'SetSpeed': 1}
+    assert stats.floors == {1: 2, 2: 1}
+    assert stats.floor_event_types[(1, 'Twirl')] == 2
+    assert stats.decoration_floors == {1: 1}
+    assert stats.angles == {0: 4}
+
+
+def test_cache_invalidated_by_mutation():
+    level = make_level()
+    stats = level.stats()
+    assert level.stats() is stats
+    level.add_event(3, 'Twirl')
+    assert level.stats() is not stats
+    assert level.stats().event_count == 4
+
+
+def test_adding_does_not_touch_cache():
+    level, other = make_level(), make_level()
+    total = level.stats()
+    total += other.stats()
+    assert total.level_count == 2 and total.event_count == 6
+    assert level.stats().level_count == 1 and level.stats().event_count == 3
+    assert sum([level.stats(), other.stats()], LevelStats()).event_types['Twirl'] == 4
+    assert level.stats().event_types['Twirl'] == 2
+
+
+def test_duration_pitch_applied_once():
+    # 每段 1 拍：前两段 120bpm，后两段 60bpm；pitch 200 时时长减半
+    assert make_level().stats().duration == 0.5 + 0.5 + 1 + 1
+    assert make_level(pitch=200).stats().duration == (0.5 + 0.5 + 1 + 1) / 2
+    level = make_level(pitch=200)
+    del level.data['actions'][2]['beatsPerMinute']
+    level.mark_modified()
+    assert level.stats().duration == 4 * 0.5 / 2
+
+
+def test_merged_duration_counts_levels():
+    timed, untimed = make_level(), make_level(bpm=0)
+    assert untimed.stats().duration is None
+    total = timed.stats() + untimed.stats()
+    assert total.level_count == 2 and total.duration_count == 1
+    assert total.duration == timed.stats().duration
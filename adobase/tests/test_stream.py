@@ -0,0 +1,136 @@
+import json
+import tracemalloc
+
+import pytest
+
+import adobase.stream as stream
+from adobase import ADOFAILevel, iter_events, iter_decorations
+from adobase.defaults import defaults_data
+from adobase.utils import to_adofai_style_json, add_bom
+
+
+def make_data():
+    data = json.loads(json.dumps(defaults_data))
+    # 字符串中含括号、引号、反斜杠、逗号和换行，检验字符串内的状态处理
+    data['actions'].append({"floor": 3, "eventType": "EditorComment", "comment": 'a "}]{ \\\\ ,\nb'})
+    data['actions'].append({"floor": 3, "eventType": "Ünï", "nested": [1, {"x": [2]}], "text": "]"})
+    return data
+
+
+def editor_layout(data):
+    # ADOFAI 编辑器写法："actions": 与 [ 分两行，且每个对象后都有尾随逗号
+    text = to_adofai_style_json(data)
+    for key in ('actions', 'decorations'):
+        text = text.replace(f'"{key}": [', f'"{key}":\n\t[')
+    return text.replace('}\n\t]', '},\n\t]')
+
+
+LAYOUTS = {
+    'adofai.adofai': lambda d: add_bom(to_adofai_style_json(d)),
+    'editor.adofai': editor_layout,
+    'minified.json': lambda d: json.dumps(d),
+    'indent2.json': lambda d: json.dumps(d, indent=2),
+    'trailing.json': lambda d: json.dumps(d, indent=2).replace('\n  ]', ',\n  ]').replace('\n    }', ',\n    }'),
+}
+
+
+@pytest.fixture
+def level_files(tmp_path):
+    data = make_data()
+    paths = []
+    for name, render in LAYOUTS.items():
+        path = tmp_path / name
+        path.write_text(render(data), encoding='utf-8')
+        paths.append(str(path))
+    return paths
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 1 << 16])
+def test_matches_load(level_files, monkeypatch, chunk_size):
+    monkeypatch.setattr(stream, 'CHUNK_SIZE', chunk_size)
+    for path in level_files:
+        expected = ADOFAILevel.load(path).data
+        assert list(iter_events(path)) == expected['actions'], path
+        assert list(iter_decorations(path)) == expected['decorations'], path
+
+
+@pytest.mark.parametrize('event_type', ['PositionTrack', 'Ünï', 'Missing'])
+def test_filter_by_type(level_files, event_type):
+    for path in level_files:
+        expected = [a for a in ADOFAILevel.load(path).data['actions'] if a['eventType'] == event_type]
+        assert list(iter_events(path, event_type)) == expected, path
+
+
+def test_decoration_type_filter(level_files):
+    for path in level_files:
+        assert [d['eventType'] for d in iter_decorations(path, 'AddDecoration')] == ['AddDecoration']
+        assert list(iter_decorations(path, 'AddText')) == []
+
+
+def test_escape_at_chunk_boundary(tmp_path, monkeypatch):
+    data = {"angleData": [0], "settings": {}, "actions": [
+        {"floor": 1, "eventType": "EditorComment", "comment": "\\" * n + '"' + "x" * n} for n in range(1, 12)
+    ]}
+    path = tmp_path / 'escape.json'
+    path.write_text(json.dumps(data), encoding='utf-8')
+    for chunk_size in range(1, 9):
+        monkeypatch.setattr(stream, 'CHUNK_SIZE', chunk_size)
+        assert list(iter_events(str(path))) == data['actions']
+
+
+def test_two_objects_on_one_line(tmp_path):
+    data = make_data()
+    text = to_adofai_style_json(data)
+    first, second = (to_adofai_style_json([a], 1, 'actions').split('\n')[1] for a in data['actions'][:2])
+    text = text.replace(f'{first},\n{second}', f'{first}, {second.strip()}')
+    assert f'{first}, {second.strip()}' in text
+    path = tmp_path / 'two.adofai'
+    path.write_text(text, encoding='utf-8')
+    assert list(iter_events(str(path))) == data['actions']
+
+
+def test_missing_and_empty_arrays(tmp_path):
+    data = make_data()
+    data['decorations'] = []
+    del data['actions']
+    for name, render in LAYOUTS.items():
+        path = tmp_path / name
+        path.write_text(render(data), encoding='utf-8')
+        assert list(iter_events(str(path))) == []
+        assert list(iter_decorations(str(path))) == []
+
+
+@pytest.mark.parametrize('sniff_size', [16, 33, 100])
+def test_lines_longer_than_sniff_size(level_files, tmp_path, monkeypatch, sniff_size):
+    # 根字段与数组首个对象同行、且行长超过分段读取长度时，不能在截断处误判
+    data = make_data()
+    text = to_adofai_style_json(data).replace('"actions": [\n\t\t', '"actions": [ ')
+    path = tmp_path / 'sameline.adofai'
+    path.write_text(text, encoding='utf-8')
+    monkeypatch.setattr(stream, 'SNIFF_SIZE', sniff_size)
+    for p in level_files + [str(path)]:
+        expected = ADOFAILevel.load(p).data
+        assert list(iter_events(p)) == expected['actions'], p
+        assert list(iter_decorations(p)) == expected['decorations'], p
+
+
+@pytest.mark.parametrize('big', ['actions', 'angleData'])
+@pytest.mark.parametrize('render', [json.dumps, to_adofai_style_json])
+def test_memory_does_not_grow_with_file_size(tmp_path, render, big):
+    data = make_data()
+    if big == 'actions':
+        data['actions'] = data['actions'] * 1000
+    else:
+        # angleData 在 adofai 风格中写在一行，行长随砖块数增长
+        data['angleData'] = [0, 90, 180, 270] * 500000
+    path = tmp_path / 'big.json'
+    path.write_text(render(data), encoding='utf-8')
+    assert path.stat().st_size > 5 * 1024 * 1024
+    tracemalloc.start()
+    try:
+        count = sum(1 for _ in iter_events(str(path)))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert count == len(data['actions'])
+    assert peak < 1024 * 1024
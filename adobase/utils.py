@@ -1,6 +1,8 @@
 # 工具函数文件，后续可扩展 
 
+import os
 import re
+import tempfile
 
 def parse_adofai_to_json_str(text: str) -> str:
     """
@@ -12,6 +14,32 @@ def parse_adofai_to_json_str(text: str) -> str:
     text = re.sub(r',([ \t\r\n]*[}\]])', r'\1', text)
     return text
 
+def _current_umask() -> int:
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+def atomic_write_text(filepath: str, text: str) -> None:
+    """
+    原子写入文本文件：先写入同目录临时文件，再替换目标文件。
+    覆盖时保留目标文件原有权限；新建时按当前 umask 设置权限（与 open(filepath, 'w') 一致）。
+    """
+    dirname = os.path.dirname(os.path.abspath(filepath))
+    try:
+        mode = os.stat(filepath).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o666 & ~_current_umask()
+    fd, tmp_path = tempfile.mkstemp(dir=dirname, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        # mkstemp 创建的临时文件权限为 0600
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
 def add_bom(text: str) -> str:
     """为字符串添加 UTF-8 BOM"""
     if not text.startswith('\ufeff'):